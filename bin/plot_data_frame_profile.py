@@ -8,6 +8,8 @@ prefear to use directly the function plot_dataframe_profile from the magikeda.un
 
 
 usage: plot_data_frame_profile.py [-h] [--sep SEP] [--encoding ENCODING]
+                                  [--chunksize CHUNKSIZE] [--dtypes DTYPES]
+                                  [--usecols USECOLS]
                                   input_file
 
 positional arguments:
@@ -19,6 +21,14 @@ optional arguments:
   --encoding ENCODING  File encoding used by the CSV file. Accepts any valid
                        encoding to pass to pandas.read_csv method. Default is
                        "latin1".
+  --chunksize CHUNKSIZE
+                       Number of rows read from the CSV at a time. Default is
+                       200000.
+  --dtypes DTYPES      JSON file with an object mapping column names to
+                       dtypes (e.g. {"age": "float64", "state": "category"}).
+                       Columns not listed have their types inferred.
+  --usecols USECOLS    Comma separated list of the columns to load. Default is
+                       to load all columns.
 Erro: too few arguments
 To exit: use 'exit', 'quit', or Ctrl-D.
 An exception has occurred, use %tb to see the full traceback.
@@ -26,9 +36,11 @@ An exception has occurred, use %tb to see the full traceback.
 """
 
 import argparse
+import json
 import sys
 import pandas as pd
 
+from pandas.api.types import is_string_dtype, union_categoricals
 from magikeda import univar
 
 class MyParser(argparse.ArgumentParser):
@@ -40,10 +52,13 @@ class MyParser(argparse.ArgumentParser):
         """
           Configure command line args
         """
-        super(MyParser, self).__init__()
-        self.add_argument('input_file', help=u'CSV file.')        
-        self.add_argument('--sep', default=',', help=u'Separator used in CSV. Default is coma ",".') 
-        self.add_argument('--encoding', default='latin1', help=u'File encoding used by the CSV file. Accepts any valid encoding to pass to pandas.read_csv method. Default is "latin1". ') 
+        super().__init__()
+        self.add_argument('input_file', help='CSV file.')        
+        self.add_argument('--sep', default=',', help='Separator used in CSV. Default is coma ",".') 
+        self.add_argument('--encoding', default='latin1', help='File encoding used by the CSV file. Accepts any valid encoding to pass to pandas.read_csv method. Default is "latin1". ') 
+        self.add_argument('--chunksize', default=200000, type=int, help='Number of rows read from the CSV at a time. Default is 200000.')
+        self.add_argument('--dtypes', default=None, help='JSON file with an object mapping column names to dtypes (e.g. {"age": "float64", "state": "category"}). Columns not listed have their types inferred.')
+        self.add_argument('--usecols', default=None, help='Comma separated list of the columns to load. Default is to load all columns.')
   
     def error(self, msg):
         """
@@ -53,6 +68,40 @@ class MyParser(argparse.ArgumentParser):
         self.print_help()
         sys.exit(2)        
         
+
+def read_csv_in_chunks(input_file, sep, encoding, chunksize, dtypes=None, usecols=None):
+    """
+        Load the CSV file a chunk of rows at a time, storing text columns as categoricals, so each
+        distinct string is kept in memory just once instead of once per row. The dtypes given are
+        passed to the parser and override the inferred ones.
+    """
+
+    # Options shared by all reads (the C engine is forced and the file is memory mapped)
+    options = dict(sep=sep, encoding=encoding, usecols=usecols, engine='c', memory_map=True)
+
+    # Determine which columns hold text from the first rows of the file (columns with a given dtype are not inferred)
+    dtypes = dict(dtypes or {})
+    head = pd.read_csv(input_file, nrows=1000, dtype=dtypes, **options)
+    text_columns = [column for column in head.columns if column not in dtypes and is_string_dtype(head[column])]
+
+    # Read the file chunk by chunk (text columns are parsed directly into categoricals)
+    dtypes.update(dict.fromkeys(text_columns, 'category'))
+    reader = pd.read_csv(input_file, chunksize=chunksize, dtype=dtypes, **options)
+    chunks = list(reader)
+    if not chunks:
+        return head
+
+    # Join the chunks column by column (each chunk may have found a different set of categories, which are sorted so
+    # the order doesn't depend on the chunk size)
+    columns = {}
+    for column in chunks[0].columns:
+        if isinstance(chunks[0][column].dtype, pd.CategoricalDtype):
+            columns[column] = union_categoricals([chunk[column] for chunk in chunks], sort_categories=True)
+        else:
+            columns[column] = pd.concat([chunk[column] for chunk in chunks], ignore_index=True)
+
+    return pd.DataFrame(columns, columns=chunks[0].columns)
+
         
 if __name__=='__main__':
     
@@ -60,11 +109,18 @@ if __name__=='__main__':
     parser = MyParser()  
     args = parser.parse_args() 
     
+    # Load the column types and the list of columns, if given
+    dtypes = None
+    if args.dtypes:
+        with open(args.dtypes) as f:
+            dtypes = json.load(f)
+    usecols = args.usecols.split(',') if args.usecols else None
+
     # Load csv file
-    data = pd.read_csv(args.input_file, sep=args.sep, encoding=args.encoding)    
+    data = read_csv_in_chunks(args.input_file, sep=args.sep, encoding=args.encoding, chunksize=args.chunksize, dtypes=dtypes, usecols=usecols)
     
     univar.plot_dataframe_profile(data)
     
-    #print data
-    print args.input_file, args.sep, args.encoding
+    #print(data)
+    print(args.input_file, args.sep, args.encoding)
     
\ No newline at end of file
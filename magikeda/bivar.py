@@ -1,10 +1,17 @@
 # -*- coding: utf-8 -*-
 """Functions to create graphs for ploting distributions of two variables at the same time.
-
-TODO: Instead of calling plot for each point, we should use directly plt.scatter function and then get the points and add the annotations.
 """
 
 import matplotlib.pyplot as plt
+import numpy as np
+import time
+
+
+# Mouse moves handled by the mouse over scatter are at least this number of seconds apart (about one frame at 60 Hz)...
+_MIN_MOVE_INTERVAL = 0.016
+
+# ... and this number of pixels apart
+_MIN_MOVE_DISTANCE = 2
 
 
 def drawTipBox(x, y, text, color, ax, alpha=0.9,):
@@ -48,27 +55,27 @@ def drawTipBox(x, y, text, color, ax, alpha=0.9,):
 def plot_mouse_over_scatter(x, y, tips, box_color=(0.95, 0.90, 1), c=None, marker='o', ax=None, **kwargs):
     """ Draw a scatter plot adding a tooltip to be show when the mouse is passes over the point.
 
-    The function calls plt.plot(...) method to each point separatedly and adds a hidden (by default)
-    annotation over it. The annotation visibility is changed to True when the point is hovered.
+    The function draws all points with a single call to ax.scatter(...) and adds a single hidden (by default)
+    annotation. When a point is hovered, the annotation is moved over it, gets its tip and is made visible.
 
     Parameters
     ----------
-    x : list (of floats)
+    x : list (of floats) or array-like
         List of x coordinates.
-    y : list (of floats)
+    y : list (of floats) or array-like
         List of y coordinates.
-    tips : list (of strings)
+    tips : list (of strings) or array-like
         List of the string that will be shown when the mouse is over the point.
     box_collor : color
         RGB color of the box behind the text. Default is (0.95, 0.90, 1).
-    c : TODO
-        TODO
+    c : list (of colors)
+        List of the colors of each point. Default is None, which means all points are blue.
     marker : Any valid marker symbol used in matplotlib scatter plots.
         The marker symbol.
     ax : Axes
         The ax where the scatter will be plotted. Default is None.
     kwargs : dict or kwargs
-        Key word args to be passed to plt.plot(...) function.
+        Key word args to be passed to ax.scatter(...) function.
 
     """
 
@@ -78,50 +85,133 @@ def plot_mouse_over_scatter(x, y, tips, box_color=(0.95, 0.90, 1), c=None, marke
 
     assert len(x) == len(y) == len(tips) == len(c)
 
-    # Initialize list of points and annotations
-    points_with_annotation = []
+    # Get the coordinates as float arrays (they're used both to draw the points and to locate them on the screen)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Get the tips as a list (so they're looked up by position, also when a pd.Series is given)
+    tips = list(tips)
 
     # Get current ax
     if ax is None:
         ax = plt.gca()
 
-    # For pair of point and tip
-    for i, x, y, tip in zip(range(0, len(c)), x, y, tips):
+    # Get the figure of the ax
+    fig = ax.figure
 
-        # Draw the point ( the comma after point "automatically extracts" the item from the list
-        point, = ax.plot(x, y, marker, color=c[i], **kwargs)
+    # Draw all the points at once (a single PathCollection instead of one artist per point)
+    points = ax.scatter(x, y, c=c, marker=marker, **kwargs)
 
-        # Draw the annotation box
-        annotation = drawTipBox(x, y, tip, box_color, ax=ax)
+    # Draw a single annotation box, shared by all points (it's moved to the hovered point and gets its tip)
+    annotation = drawTipBox(0, 0, '', box_color, ax=ax)
 
-        # Disable the annotation visibility
-        annotation.set_visible(False)
+    # Disable the annotation visibility
+    annotation.set_visible(False)
 
-        # Store the point with its annotation in a list
-        points_with_annotation.append([point, annotation])
+    # Keep the annotation out of the normal figure draws when blitting is available (it's drawn on top of the saved
+    # background when shown). Otherwise it's drawn along with the rest of the figure
+    annotation.set_animated(fig.canvas.supports_blit)
 
-    # Function to show/hide points with mouseover event (to be execute whenever the mouse is moved)
-    def on_move(event):
+    # Coordinates of the points in data space
+    xy = np.column_stack([x, y])
+
+    # Radius (in pixels) around a point in which the mouse is considered to be over it (half the marker width)
+    radius = max(np.sqrt(points.get_sizes().max()) / 2. * fig.dpi / 72., 1.)
 
+    # Spatial index mapping grid cells (of the size of the radius) to the indices of the points inside them, the point
+    # positions in display coordinates and the background of the ax without the annotation. They are rebuilt whenever
+    # the figure is drawn, as zooming, panning or resizing moves the points on the screen. The index of the point whose
+    # tip is being shown is also kept (None when the annotation is hidden).
+    cells = {}
+    state = {'xy_display': None, 'background': None, 'shown': None}
 
-        # For each point, annotation pair
-        for point, annotation in points_with_annotation:
+    # Time and position of the last mouse move handled, and the last move delayed for coming too soon after it
+    last_move = {'t': 0., 'x': None, 'y': None, 'pending': None}
 
-            # Determine whether it should be visible (when the space occupied by the point contains the coordinates of the mouseover event
-            should_be_visible = (point.contains(event)[0] == True)
+    # Function to draw the annotation over the saved background (to be executed whenever it changes)
+    def draw_annotation():
 
-            # If the visibility of a point changed
-            if should_be_visible != annotation.get_visible():
+        # Blit just the ax area, if the backend supports it. Otherwise (or if the figure was not drawn yet), redraw the
+        # whole figure (which, when blitting, saves the background and calls this function again)
+        if fig.canvas.supports_blit and state['background'] is not None:
+            fig.canvas.restore_region(state['background'])
+            if annotation.get_visible():
+                ax.draw_artist(annotation)
+            fig.canvas.blit(ax.bbox)
+        else:
+            fig.canvas.draw_idle()
 
-                # Show the point and redraw
-                annotation.set_visible(should_be_visible)
-                plt.draw()
+    # Function to rebuild the spatial index and save the background (to be executed whenever the figure is drawn)
+    def on_draw(event):
 
+        # Get points positions in display coordinates and put each point in the cell that contains it
+        state['xy_display'] = ax.transData.transform(xy)
+        cells.clear()
+        for i, cell in enumerate(np.floor(state['xy_display'] / radius).astype(int)):
+            cells.setdefault(tuple(cell), []).append(i)
 
-    # Get current figure
-    fig = plt.gcf()
+        # Save the ax background and draw the annotation over it again
+        if fig.canvas.supports_blit:
+            state['background'] = fig.canvas.copy_from_bbox(ax.bbox)
+            if annotation.get_visible():
+                draw_annotation()
+
+    # Function to filter the mouse moves (to be executed whenever the mouse is moved)
+    def on_move(event):
 
-    # Register the move event with the on_move function
+        # Skip moves too close in space to the last one handled (the mouse fires many more events than needed)
+        if last_move['x'] is not None and abs(event.x - last_move['x']) < _MIN_MOVE_DISTANCE and abs(event.y - last_move['y']) < _MIN_MOVE_DISTANCE:
+            return
+
+        # Delay moves too close in time to the last one handled (just the last one delayed is handled, when the timer
+        # fires, so the tip still follows the mouse once it stops)
+        if time.monotonic() - last_move['t'] < _MIN_MOVE_INTERVAL:
+            last_move['pending'] = event
+            timer.start()
+            return
+
+        update_tip(event)
+
+    # Function to handle the last move delayed (to be executed when the timer fires)
+    def on_timer():
+        if last_move['pending'] is not None:
+            update_tip(last_move['pending'])
+
+    # Function to show/hide the tip according to the mouse position
+    def update_tip(event):
+        last_move.update(t=time.monotonic(), x=event.x, y=event.y, pending=None)
+
+        # Determine the index of the point closest to the mouse, among the ones close enough to it (just the points in
+        # the cells around the mouse need to be checked)
+        hovered, hovered_distance = None, radius**2
+        if event.inaxes is ax and state['xy_display'] is not None:
+            cell_x, cell_y = int(np.floor(event.x / radius)), int(np.floor(event.y / radius))
+            for neighbour in [(cell_x + i, cell_y + j) for i in (-1, 0, 1) for j in (-1, 0, 1)]:
+                for idx in cells.get(neighbour, []):
+                    point_x, point_y = state['xy_display'][idx]
+                    distance = (point_x - event.x)**2 + (point_y - event.y)**2
+                    if distance <= hovered_distance:
+                        hovered, hovered_distance = idx, distance
+
+        # If the hovered point changed
+        if hovered != state['shown']:
+
+            # Move the annotation to the hovered point and show its tip (or hide it, if no point is hovered), and redraw
+            if hovered is not None:
+                annotation.xy = (x[hovered], y[hovered])
+                annotation.set_text(tips[hovered])
+            annotation.set_visible(hovered is not None)
+            state['shown'] = hovered
+            draw_annotation()
+
+
+    # One shot timer handling the last move delayed
+    timer = fig.canvas.new_timer(interval=int(_MIN_MOVE_INTERVAL * 1000))
+    timer.single_shot = True
+    timer.add_callback(on_timer)
+
+    # Register the draw and move events with the on_draw and on_move functions
+    on_draw_id = fig.canvas.mpl_connect('draw_event', on_draw)
     on_move_id = fig.canvas.mpl_connect('motion_notify_event', on_move)
 
     plt.show()
@@ -4,16 +4,95 @@ Functions to plot maps and calculate distances.
 
 TODO:
  - Replace box value given in aspect_ratio by a box parameter
- - make color attribute work with connect_points
  - Return ax
 """
 
-from math import radians, cos, sin, asin, sqrt
+from math import hypot
 import mpl_toolkits.basemap as bm
 import matplotlib.pyplot as plt
 
 import numpy as np
-import gc
+
+
+# Segments shorter than this are considered degenerated (a single point) by the point to segment distance functions
+_MIN_SEGMENT_LENGTH = 0.00000001
+
+# Projections falling before this fraction of the segment are considered to be outside of it
+_MIN_SEGMENT_PROJECTION = 0.00001
+
+
+def _asf64(a):
+    """Return the coordinates given (scalar, list, pd.Series, ...) as a contiguous float64 np.ndarray (without copying
+    them when they already are one). Scalars are kept as 0-d arrays."""
+    a = np.asarray(a, dtype=np.float64)
+    return a if a.flags.c_contiguous else np.ascontiguousarray(a)
+
+
+def _fit_extremities_bbox(min_lat, max_lat, min_lon, max_lon):
+    """Return the box just containing the extremities of the path."""
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def _square_bbox(min_lat, max_lat, min_lon, max_lon):
+    """Return the box whose top makes the map a square (the 3/4 factor takes into account the different scales between
+    longitudes and latitudes)."""
+    return min_lat, min_lat + abs(max_lon - min_lon) * 3/4, min_lon, max_lon
+
+
+# Functions computing the map box for the aspect ratios that can be given by name
+_NAMED_ASPECT_RATIOS = {
+    'fit_extremities': _fit_extremities_bbox,
+    'square': _square_bbox,
+}
+
+
+def _compute_bbox(min_lat, max_lat, min_lon, max_lon, aspect_ratio, padding):
+    """Return the box (min_lat, max_lat, min_lon, max_lon) of a map showing a path with the extremities given.
+
+    The aspect_ratio and padding parameters have the same meaning as in plot_path_from_above.
+    """
+
+    # Boxes given by name
+    if isinstance(aspect_ratio, str) and aspect_ratio in _NAMED_ASPECT_RATIOS:
+        box = _NAMED_ASPECT_RATIOS[aspect_ratio](min_lat, max_lat, min_lon, max_lon)
+
+    # Boxes given by a ratio, which are the square box with the same amount of space removed from the top and the bottom
+    elif isinstance(aspect_ratio, float):
+        height = abs(max_lon - min_lon) * 3/4
+        removed = height * (0.5 - aspect_ratio/2)
+        box = min_lat + removed, min_lat + height - removed, min_lon, max_lon
+
+    # Boxes given by its coordinates
+    elif not isinstance(aspect_ratio, str) and len(aspect_ratio)==4:
+        box = tuple(aspect_ratio)
+
+    else:
+        raise Exception('Invalid value for parameter aspect_ratio: %s' % aspect_ratio)
+
+    # Add some space around the path (the fator 3/4 is needed to take into account the different scales between
+    # longitudes and latitudes)
+    min_lat, max_lat, min_lon, max_lon = box
+    return min_lat - padding * 3/4, max_lat + padding * 3/4, min_lon - padding, max_lon + padding
+
+
+def _grid_lines(min_value, max_value, max_lines=8):
+    """Return the positions (in whole degrees) of about max_lines parallels or meridians covering the range given."""
+    step = max(1, round((max_value - min_value) / max_lines))
+    return np.arange(np.floor(min_value), np.ceil(max_value) + 1, step)
+
+
+def _get_basemap(min_lon, max_lon, min_lat, max_lat, resolution='l'):
+    """Return a Mercator Basemap covering the box given.
+
+    Instances are not cached: each one keeps the relief image warped by shadedrelief(), which takes hundreds of MB.
+    """
+    return bm.Basemap(projection='merc',
+        resolution = resolution, area_thresh = 1,
+        llcrnrlon= min_lon,
+        urcrnrlon= max_lon,
+        llcrnrlat= min_lat,
+        urcrnrlat= max_lat
+    )
 
 
 def plot_path_from_above(lon, lat, padding=1., show_map=True, color='red', aspect_ratio=3./4, ax=None):
@@ -24,17 +103,17 @@ def plot_path_from_above(lon, lat, padding=1., show_map=True, color='red', aspec
 
     Parameters
     ----------
-    lon : pd.Series
+    lon : pd.Series or array-like
         Series containing the list of longitudes.
-    lat : pd.Series
+    lat : pd.Series or array-like
         Series containing the list of latitudes.
     padding : float
-        Space to add arond path (in degrees). Default is 2 degrees.
+        Space to add arond path (in degrees). Default is 1 degree.
     show_map : boolean
         Whether to draw the map around the path. Default is True.
     color : color or list of colors.
-        The color of the path. Default is red. Optionally, if the parameter connect_poiints is False, a list of colors
-        can be passed (having the same size as the number of dots). Example:
+        The color of the path. Default is red. Optionally, a list of colors can be passed (having the same size as the
+        number of dots). Example:
 
         >>> colors = plt.cm.get_cmap('coolwarm', number_of_colors)
         >>> color_idx = [ int(i) for i in color_values ]
@@ -49,137 +128,138 @@ def plot_path_from_above(lon, lat, padding=1., show_map=True, color='red', aspec
 
     """
 
-    # Determine min and max longitude and latitude and add padding around them
-    min_lat = lat.min()
-    max_lat = lat.max()
-    min_lon = lon.min()
-    max_lon = lon.max()
-
-
-    # Determine the rightmost point of the graph
-    if aspect_ratio=='fit_extremities':
-
-        # The rightmost point is just the max lat added with the padding
-        max_lat = max_lat # What's this?
-        pass
-
-    elif aspect_ratio=='square':
-
-        # The rightmost point the the that make the map a squared box
-        max_lat = min_lat + np.abs(max_lon - min_lon) * 3/4 # The 3/4 is need to take into account the different scales between longitudes and latitudes
-
-    elif isinstance(aspect_ratio, float):
-
-        # We reduce some space from the latitude dimension to make the map obey the aspect ration given in the parameter aspect_ratio
-        max_lat = min_lat + np.abs(max_lon - min_lon) * 3/4
-        min_lat = min_lat + np.abs(max_lat - min_lat) * (0.5 - aspect_ratio/2) # make the min_lat a little higher
-        max_lat = max_lat - np.abs(max_lat - min_lat) * (0.5 - aspect_ratio/2) # make the max_lat a little lower
-
-    elif len(aspect_ratio)==4:
-
-        # Get the coordinates provided
-        min_lat, max_lat, min_lon, max_lon = aspect_ratio
-
-    else:
-        raise Exception('Invalid value for parameter aspect_ratio: %s' % aspect_ratio)
-
-
-    # Add some space around the path
-    min_lat = min_lat - padding * 3/4 # The fator 3/4 is needed to take into account the different scales between longitudes and latitudes
-    max_lat = max_lat + padding * 3/4
-    min_lon = min_lon - padding
-    max_lon = max_lon + padding
-
+    # Get the coordinates as float arrays (so pandas is not involved in the reductions and in the plotting bellow)
+    lat = _asf64(lat)
+    lon = _asf64(lon)
 
+    # Determine min and max longitude and latitude (ignoring missing coordinates)
+    min_lat, max_lat = np.nanmin(lat), np.nanmax(lat)
+    min_lon, max_lon = np.nanmin(lon), np.nanmax(lon)
 
+    # Determine the box containing the map
+    min_lat, max_lat, min_lon, max_lon = _compute_bbox(min_lat, max_lat, min_lon, max_lon, aspect_ratio, padding)
 
     # Draw map, if specified
     if show_map:
 
-        # Create map centered around the path
-        m = bm.Basemap(projection='merc',
-            resolution = 'l', area_thresh = 1,
-            llcrnrlon= min_lon,
-            urcrnrlon= max_lon,
-            llcrnrlat= min_lat,
-            urcrnrlat= max_lat,
-            ax=ax
-        )
+        # Get map centered around the path
+        m = _get_basemap(min_lon, max_lon, min_lat, max_lat)
 
-        # Draw paralles and meridians
-        m.drawparallels(np.arange(-80.,81.,2.))
-        m.drawmeridians(np.arange(-180.,181.,2.))
+        # Draw paralles and meridians (just the ones inside the map)
+        m.drawparallels(_grid_lines(min_lat, max_lat), ax=ax)
+        m.drawmeridians(_grid_lines(min_lon, max_lon), ax=ax)
 
         # Draw relief and rivers
-        m.shadedrelief()
-        m.drawrivers()
+        m.shadedrelief(ax=ax)
+        m.drawrivers(ax=ax)
 
-        # Draw coordinates on map
-        m.scatter(lon.values, lat.values, latlon=True, color=color, ax=ax)
+        # Draw coordinates on map (rasterized, so vector outputs don't store every marker, and without marker edges)
+        m.scatter(lon, lat, latlon=True, color=color, ax=ax, rasterized=True, linewidths=0)
     else:
 
         # Draw coordinates without using a mp
-        ax.scatter(lon.values, lat.values, color=color)
-
-    gc.collect()
+        ax.scatter(lon, lat, color=color, rasterized=True, linewidths=0)
 
 
 def haversine(lon1, lat1, lon2, lat2):
-    """Calculate the great circle distance between two points on the earth (specified in decimal degrees)
-    
-    This function found was found in many different sites on the internet.
+    """Calculate the great circle distance (in kilometers) between two points on the earth (specified in decimal degrees)
+
+    The coordinates can be scalars or array-likes (e.g. pd.Series) of the same length. In the second case the distances
+    are computed element-wise and an array is returned. This function found was found in many different sites on the internet.
     """
-    # convert decimal degrees to radians 
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    # convert decimal degrees to radians (as float64 arrays, so the formula bellow runs over whole arrays at once)
+    lon1, lat1, lon2, lat2 = (np.radians(_asf64(a)) for a in (lon1, lat1, lon2, lat2))
 
     # haversine formula 
     dlon = lon2 - lon1 
     dlat = lat2 - lat1 
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a)) 
-    r = 6371 # Radius of earth in kilometers. Use 3956 for miles
-    return c * r
+    a = np.sin(dlat*0.5)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon*0.5)**2
+    c = 2 * np.arcsin(np.sqrt(a))
+    r = 6371. # Radius of earth in kilometers. Use 3956 for miles
+    distance = c * r
+
+    # Keep returning a plain float when the coordinates given are scalars
+    if distance.ndim == 0:
+        return float(distance)
+
+    return distance
 
 def _lineMagnitude (x1, y1, x2, y2):
     """Returns the euclidean distance between two points."""
-    lineMagnitude = sqrt(pow((x2 - x1), 2)+ pow((y2 - y1), 2))
-    return lineMagnitude
+    return hypot(x2 - x1, y2 - y1)
 
 
 def distance_from_point_to_segment (px, py, x1, y1, x2, y2):
     """Returns the minimum distance between a point (px, py) and a line segment (x1, y1, x2, y2).
 
+    If the segment is degenerated (its two points coincide), the distance returned is infinite.
+
     Method adapted from Map Rantala, available at:
     https://nodedangles.wordpress.com/2010/05/16/measuring-distance-from-a-point-to-a-line-segment/
     """
-    LineMag = _lineMagnitude(x1, y1, x2, y2)
+    dx = x2 - x1
+    dy = y2 - y1
 
-    if LineMag < 0.00000001:
-        DistancePointLine = 9999
-        return DistancePointLine
+    # Compare squared lengths, so no sqrt is needed to detect degenerated segments
+    SquaredLineMag = dx * dx + dy * dy
 
-    u1 = (((px - x1) * (x2 - x1)) + ((py - y1) * (y2 - y1)))
-    u = u1 / (LineMag * LineMag)
+    if SquaredLineMag < _MIN_SEGMENT_LENGTH * _MIN_SEGMENT_LENGTH:
+        return float('inf')
 
-    if (u < 0.00001) or (u > 1):
+    u1 = ((px - x1) * dx) + ((py - y1) * dy)
+    u = u1 / SquaredLineMag
+
+    if (u < _MIN_SEGMENT_PROJECTION) or (u > 1):
         #// closest point does not fall within the line segment, take the shorter distance
         #// to an endpoint
         ix = _lineMagnitude(px, py, x1, y1)
         iy = _lineMagnitude(px, py, x2, y2)
-        if ix > iy:
-            DistancePointLine = iy
-        else:
-            DistancePointLine = ix
+        DistancePointLine = ix if ix < iy else iy
     else:
         # Intersecting point is on the line, use the formula
-        ix = x1 + u * (x2 - x1)
-        iy = y1 + u * (y2 - y1)
+        ix = x1 + u * dx
+        iy = y1 + u * dy
         DistancePointLine = _lineMagnitude(px, py, ix, iy)
 
     return DistancePointLine
 
 
+def distances_points_to_segments(px, py, x1, y1, x2, y2):
+    """Batched version of distance_from_point_to_segment, computing the distances of many points to many segments at once.
+
+    All parameters can be scalars or array-likes (e.g. pd.Series) and are broadcast against each other, so it's possible,
+    for instance, to compute the distances of a list of points to a single segment, or the distance of a point to each
+    segment of a path. The computations are done with NumPy over whole arrays instead of calling the scalar function
+    in a Python loop.
+
+    Returns
+    -------
+    distances : np.ndarray
+        Array with the minimum distances between each point and segment (infinite for degenerated segments).
+
+    """
+
+    # Convert parameters to float64 arrays
+    px, py, x1, y1, x2, y2 = (_asf64(a) for a in (px, py, x1, y1, x2, y2))
+
+    # Segments lengths
+    dx = x2 - x1
+    dy = y2 - y1
+    line_mag = np.hypot(dx, dy)
+
+    # Position of the projection of each point over the line (degenerated segments give nan here, handled bellow)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        u = ((px - x1) * dx + (py - y1) * dy) / (line_mag * line_mag)
+
+    # Shorter distance to an endpoint (used when the closest point does not fall within the line segment)
+    endpoint_distance = np.minimum(np.hypot(px - x1, py - y1), np.hypot(px - x2, py - y2))
+
+    # Distance to the intersecting point on the line
+    line_distance = np.hypot(px - (x1 + u*dx), py - (y1 + u*dy))
+
+    # Choose the distance according to where the projection falls, and flag degenerated segments
+    distances = np.where((u < _MIN_SEGMENT_PROJECTION) | (u > 1), endpoint_distance, line_distance)
+    distances = np.where(line_mag < _MIN_SEGMENT_LENGTH, np.inf, distances)
 
-if __name__=='__main__':
+    return distances
 
-    pass
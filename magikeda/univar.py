@@ -4,29 +4,116 @@
 
 
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
+import functools
 import math
 
-from matplotlib.gridspec import GridSpec
+from concurrent.futures import ThreadPoolExecutor
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, is_string_dtype
 
 
 def _is_numeric(series):
-    """ Determine if the pandas.core.series.Series is numeric """
-    return series.dtype == 'int' or series.dtype == 'float'
+    """ Determine if the pandas.core.series.Series is numeric (of any int or float type, booleans are not included) """
+    return is_numeric_dtype(series.dtype) and not is_bool_dtype(series.dtype)
 
 def _is_categorical(series):
-    """ Determine if the pandas.core.series.Series is categorical """
-    return str(series.dtype) == 'object' or str(series.dtype) == 'category'
+    """ Determine if the pandas.core.series.Series is categorical (strings, objects or categories) """
+    return is_string_dtype(series.dtype) or isinstance(series.dtype, pd.CategoricalDtype)
 
-def _get_percentage_of_categorical(series):
-    """ Return a Pandas series with the percents of each category, indexed by the categries names """
-    counts = series.value_counts()
-    porcentagens = 100 * (counts / sum(counts))
-    return porcentagens
+def _get_codes(series, categorias):
+    """ Return the position in categorias of the category of each value of the series (-1 for missing values and
+    values not in categorias) """
 
+    # Categorical series already carry codes, which just need to be translated (no hashing of the values needed)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
 
-def plot_bar_chart(data, cmap='Accent', color=None, xlabel='', ylabel='', title='', width=0.9, xticks_rotation=0, series_legends=None, ax=None):
+        # When its categories are the ones being plotted, the codes already are the positions (and when it has no
+        # categories, all codes already are -1)
+        if series.cat.categories is categorias or series.cat.categories.equals(categorias) or len(series.cat.categories) == 0:
+            return codes
+
+        # Otherwise, find the position in categorias of each category of the series (once per category, not per value)
+        posicoes = pd.Index(categorias).get_indexer(series.cat.categories)
+        return np.where(codes >= 0, posicoes[codes], -1)
+
+    # Other series have each value looked up in categorias (pd.Categorical would warn about values not in categorias)
+    return pd.Index(categorias).get_indexer(series)
+
+def _count_codes(codes_list, num_of_categories):
+    """ Return a numpy array with the number of occurrences of each code (in the columns) in each array of codes in
+    codes_list (in the rows). Negative codes (missing values) are not counted. """
+
+    # Shift the valid codes of each array to the position of its (array, code) pair
+    indices = [codes[codes >= 0].astype(np.int64) + idx * num_of_categories for idx, codes in enumerate(codes_list)]
+
+    # Count all (array, code) pairs at once
+    counts = np.bincount(np.concatenate(indices), minlength=len(codes_list) * num_of_categories)
+    return counts.reshape(len(codes_list), num_of_categories)
+
+def _to_percentages(counts, totais):
+    """ Return the counts (one row per series) as percents of the total number of non missing values of each series
+    (series without values get 0% in all categories) """
+    totais = np.asarray(totais, dtype=np.float64)[:, np.newaxis]
+    return np.divide(counts * 100., totais, out=np.zeros(np.shape(counts)), where=totais > 0)
+
+def _get_percentage_of_categorical(data, categorias, totais=None):
+    """ Return a numpy array with the percents of each category in categorias (in the same order, in the columns) for
+    each series in the list data (in the rows), relative to all non missing values of the series (including the ones
+    not in categorias). The number of non missing values of each series is computed if totais is not given. """
+
+    # Map the values of each series to the position of its category (values missing or not in categorias have code -1)
+    counts = _count_codes([_get_codes(series, categorias) for series in data], len(categorias))
+
+    if totais is None:
+        totais = [series.count() for series in data]
+    return _to_percentages(counts, totais)
+
+
+def _counts_for_frame(data_frame, cat_cols):
+    """ Return a dict associating each column in cat_cols (which must have the category dtype) to a numpy array with the
+    number of occurrences of each of its categories (in the order of its categories) """
+
+    # Group the columns having the same categories, so the columns of each group are counted in a single pass
+    groups = {}
+    for column_name in cat_cols:
+        groups.setdefault(data_frame[column_name].dtype, []).append(column_name)
+
+    counts = {}
+    for dtype, columns in groups.items():
+        num_of_categories = len(dtype.categories)
+
+        # Store the codes of the group in a single (columns x rows) array of the narrowest int type holding them
+        tipo = np.int8 if num_of_categories <= 127 else np.int16 if num_of_categories <= 32767 else np.int32
+        codes = np.empty((len(columns), len(data_frame)), dtype=tipo)
+        for idx, column_name in enumerate(columns):
+            codes[idx] = data_frame[column_name].cat.codes.to_numpy()
+
+        # Shift the valid codes of each row to the position of its (column, code) pair and count all of them at once
+        validos = codes >= 0
+        indices = codes.astype(np.int64) + (np.arange(len(columns)) * num_of_categories)[:, np.newaxis]
+        group_counts = np.bincount(indices[validos], minlength=len(columns) * num_of_categories)
+        counts.update(zip(columns, group_counts.reshape(len(columns), num_of_categories)))
+    return counts
+
+
+def _histogram_of_column(series, bins):
+    """ Return the counts and the edges of the histogram of the values of the numeric series (missing values are dropped),
+    or None if the series has no values """
+    valores = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    valores = valores[~np.isnan(valores)]
+    return np.histogram(valores, bins=bins) if valores.size > 0 else None
+
+
+@functools.lru_cache(maxsize=32)
+def _get_cmap_colors(cmap, n):
+    """ Return an array with the RGBA colors of the colormap named cmap resampled to n colors (cached, as the profile of
+    a data frame asks for the same colors once per categorical column) """
+    import matplotlib
+    return matplotlib.colormaps[cmap].resampled(n)(np.arange(n))
+
+
+def plot_bar_chart(data, cmap='Accent', color=None, xlabel='', ylabel='', title='', width=0.9, xticks_rotation=0, series_legends=None, ax=None, counts=None):
     """Plot a barplot showing the distribution of a categorical variable (for one or multiple series of data).
 
     It's similar to series.value_counts().plot(kind='bar') but can also be used with multiple serires at the same time (a lista of series in data).
@@ -55,6 +142,9 @@ def plot_bar_chart(data, cmap='Accent', color=None, xlabel='', ylabel='', title=
         Whether to show or not the legend box.
     ax
         Axes in which to plot the graph
+    counts : np.ndarray
+        Number of occurrences of each category, already counted (one row per series, or a single row for a single
+        series), in the same order as the categories. Default is None, which means to count them from data.
 
     Returns
     -------
@@ -68,22 +158,23 @@ def plot_bar_chart(data, cmap='Accent', color=None, xlabel='', ylabel='', title=
         data = [data]
         
     # Determine series type (pandas can represent categorical data with at least three different classes!)
-    data_type = str(data[0].dtype)
+    data_type = data[0].dtype
   
-    # If the Series is of "objects" (usually strings)
-    if data_type == 'object':
-        
-        # Get list of different strings
-        categorias = np.unique(data)
-        
     # If it is a series create by pd.Series([...], dtype='category') or equivalent (e.g. pd.Series(pd.Categorical([...], [...])) )
-    elif data_type == 'category':             
+    if isinstance(data_type, pd.CategoricalDtype):
         
         # Get list of categories
         categorias = data[0].cat.categories # We assume here that the first series has all categories (BUG: it can be wrong!!!)
         
+    # If the Series is of "objects" or strings
+    elif is_string_dtype(data_type):
+        
+        # Get list of different strings (hash based unique over the values of all series, sorted just once at the end)
+        valores = np.concatenate([s.to_numpy() for s in data]) if len(data) > 1 else data[0].to_numpy()
+        categorias = np.sort(pd.unique(valores[pd.notna(valores)]))
+        
     else:
-        raise Exception('Invalid data type %s' % data[0].dtype )
+        raise Exception('Invalid data type %s' % data_type)
     
     # Number of different categories
     num_of_categories = len(categorias)
@@ -91,32 +182,46 @@ def plot_bar_chart(data, cmap='Accent', color=None, xlabel='', ylabel='', title=
     # Number of series
     num_de_series = len(data)
     
-    # Colormap to use in the graph
-    colors = plt.cm.get_cmap(cmap, num_de_series)     
+    # Color of each series (the one given, or the colormap colors)
+    series_colors = [color] * num_de_series if color is not None else _get_cmap_colors(cmap, num_de_series)
     
     # Position of each category
     x_locations = np.arange(num_of_categories) * num_de_series
     
-    # Create figure
-    if ax == None:
+    # Create figure (matplotlib is only imported when something is plotted)
+    if ax is None:
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots()
     
+    # Number of non missing values of each series
+    totais = [series.count() for series in data]
+
+    # If there is nothing to count (no categories or no non missing values at all), leave the axes empty
+    if num_of_categories == 0 or sum(totais) == 0:
+        ax.set_ylabel(ylabel)
+        ax.set_xlabel(xlabel)
+        ax.set_title(title)
+        return ax
+    
     # Create series names, if not provided    
-    if series_legends == None:    
+    if series_legends is None:    
         series_legends = ['Series %i' % i for i in range(1, num_de_series + 1)]    
     
+    # Compute the porcentage of each category in each series (in the same order as the legend), relative to all non
+    # missing values of the series
+    if counts is None:
+        porcentagens = _get_percentage_of_categorical(data, categorias, totais)
+    else:
+        porcentagens = _to_percentages(np.asarray(counts).reshape(num_de_series, num_of_categories), totais)
+    
+    # Compute the x position of the bars of every series at once (one row per series)
+    posicoes_x = x_locations[np.newaxis, :] + width * np.arange(num_de_series)[:, np.newaxis]
+
     # For each series
-    for idx, series in enumerate(data):
-               
-        # Compute the porcentage of each category
-        porcentagens = _get_percentage_of_categorical(series)      
-        porcentagens = porcentagens[categorias] # Assure that percentages will be returned in the same order as the legend
-        
-        # Determine color to use in this series
-        series_color = color if color != None else colors(idx)      
+    for idx in range(num_de_series):
         
         # Plot bars
-        ax.bar(x_locations + idx*width, porcentagens, width, color=series_color, label=series_legends[idx])
+        ax.bar(posicoes_x[idx], porcentagens[idx], width, color=series_colors[idx], label=series_legends[idx])
 
     # Plot title and axis labels
     ax.set_ylabel(ylabel)
@@ -137,7 +242,6 @@ def plot_bar_chart(data, cmap='Accent', color=None, xlabel='', ylabel='', title=
         
         # Draw categories names
         ax.set_xticks(x_locations + width/2)
-        categorias = [cat.decode('utf8') for cat in categorias] # Convert categires names to utf8 (matplotlib doesn't non ascii chars)
         ax.set_xticklabels(categorias, rotation=xticks_rotation)
     
     
@@ -205,21 +309,22 @@ def plot_dataframe_profile(data_frame, include_cols=None, exclude_cols=None, sha
     """
     
     # Keep just specified columns, if it is the case
-    if include_cols != None:
+    if include_cols is not None:
         #data_frame = data_frame[include_cols]
         columns_kept = include_cols
     else:
         columns_kept = data_frame.columns
         
     # Remove cols specified
-    if exclude_cols != None:
+    if exclude_cols is not None:
+        exclude_cols = set(exclude_cols)
         columns_kept = [x for x in columns_kept if x not in exclude_cols]
             
     # Get number of columns
     num_of_columns = len(columns_kept)
     
     # Get the number of rows and cols
-    if shape != None:
+    if shape is not None:
         rows, cols = shape  # Unpack tuple passed as parameter
     else:
         
@@ -229,14 +334,44 @@ def plot_dataframe_profile(data_frame, include_cols=None, exclude_cols=None, sha
         # Number or rows in the plot (the necessary to put all variables)
         rows = int(math.ceil(num_of_columns / float(cols)))
     
-    # Create a grid with rows x cols subplots
-    gs = GridSpec(rows, cols, hspace=hspace, wspace=wspace)        
+    # Create a grid with rows x cols subplots in the current figure, all at once (the ones left without a column are hidden)
+    import matplotlib.pyplot as plt
+    axes = plt.gcf().subplots(rows, cols, squeeze=False, gridspec_kw=dict(hspace=hspace, wspace=wspace)).flatten()
+    for ax in axes[num_of_columns:]:
+        ax.set_visible(False)
+    
+    # Get the series of each column (looking up each column just once)
+    series_list = [data_frame[column_name] for column_name in columns_kept]
+    
+    # Determine the kind of each column ('categorical', 'numeric' or None, for columns that can't be plotted)
+    col_kinds = {}
+    for column_name, series in zip(columns_kept, series_list):
+        if _is_categorical(series):
+            col_kinds[column_name] = 'categorical'
+        elif _is_numeric(series):
+            col_kinds[column_name] = 'numeric'
+        else:
+            col_kinds[column_name] = None
+    
+    # Count the categories of the columns with the category dtype (straight from their codes)
+    cat_cols = [column_name for column_name, series in zip(columns_kept, series_list) if isinstance(series.dtype, pd.CategoricalDtype)]
+    counts = _counts_for_frame(data_frame, cat_cols)
+    
+    # Compute the histograms of the numeric columns in parallel threads (numpy releases the GIL while going through large
+    # arrays). Matplotlib is not thread safe, so the drawing bellow stays in this thread.
+    num_cols = [column_name for column_name in columns_kept if col_kinds[column_name] == 'numeric']
+    num_series = [series for column_name, series in zip(columns_kept, series_list) if col_kinds[column_name] == 'numeric']
+    with ThreadPoolExecutor() as executor:
+        histogramas = dict(zip(num_cols, executor.map(_histogram_of_column, num_series, [bins] * len(num_series))))
+    
+    # Calculate the percent of the rows that each row represents (used to transform the histograms counts in percents)
+    porcentagem_por_linha = 100. / max(len(data_frame), 1)
     
     # For each column
-    for col_idx, column_name in enumerate(columns_kept):        
+    for col_idx, (column_name, series) in enumerate(zip(columns_kept, series_list)):
         
-        # Create the subplot
-        ax = plt.subplot(gs[col_idx])        
+        # Get the subplot
+        ax = axes[col_idx]
         
         # Determine the rotation of xticks for this plot                
         rotation = xticks_rotation[column_name] if column_name in xticks_rotation else default_xticks_rotation            
@@ -245,24 +380,28 @@ def plot_dataframe_profile(data_frame, include_cols=None, exclude_cols=None, sha
         subplot_color = colors[column_name] if column_name in colors else default_color
         
         # Determine subplot title
-        subplot_title = titles[column_name] if column_name in titles else column_name.decode('utf8')    
+        subplot_title = titles[column_name] if column_name in titles else str(column_name)
         
         # Is it is categorical
-        if _is_categorical(data_frame[column_name]):                      
+        if col_kinds[column_name] == 'categorical':
             
             # Plot barplot
-            plot_bar_chart(data_frame[column_name], ax=ax, title=subplot_title, xticks_rotation=rotation, color=subplot_color)         
+            plot_bar_chart(series, ax=ax, title=subplot_title, xticks_rotation=rotation, color=subplot_color, counts=counts.get(column_name))         
         
         # If it is numeric
-        if _is_numeric(data_frame[column_name]):
+        elif col_kinds[column_name] == 'numeric':
+            
+            # If the column is empty (or has only missing values), there is nothing to plot
+            if histogramas[column_name] is None:
+                ax.text(0.5, 0.5, 'no data', ha='center', va='center', transform=ax.transAxes)
             
-            # Calculate the weiths used to transform data in percents
-            weigths = (np.zeros_like(data_frame[column_name]) + 100.) / len(data_frame[column_name])
+            # Otherwise, plot the histogram as bars (missing values still count in the percentages)
+            else:
+                contagens, limites = histogramas[column_name]
+                ax.bar(limites[:-1], contagens * porcentagem_por_linha, width=np.diff(limites), align='edge', color=subplot_color)
+                ax.grid()
             
-            # Plot histogram
-            ax.hist(data_frame[column_name], weights=weigths, color=subplot_color, bins=bins)
             ax.set_title(subplot_title)
-            ax.grid()
             
         # Set the y label
         ylabel = ylabels[column_name] if column_name in ylabels else default_ylabel
@@ -276,7 +415,7 @@ def plot_dataframe_profile(data_frame, include_cols=None, exclude_cols=None, sha
     plt.suptitle(title)
             
     # Return the GridSpec with subplots
-    return gs
+    return axes[0].get_gridspec()
 
 
 def add_extra_xaxis(fig, x, labels, padding=35):
@@ -318,7 +457,7 @@ def add_extra_xaxis(fig, x, labels, padding=35):
     new_ax.yaxis.set_visible(False)
 
     # Hide spines (unless the boottom one)
-    for spinename, spine in new_ax.spines.iteritems():
+    for spinename, spine in new_ax.spines.items():
         if spinename != 'bottom':
             spine.set_visible(False)
 
@@ -326,7 +465,7 @@ def add_extra_xaxis(fig, x, labels, padding=35):
     new_ax.spines['bottom'].set_position(('outward', padding))
 
     # Change tick labels
-    plt.xticks([0] + x, [''] + labels) # the [0] and [''] stuff is to add an empty lable in the first position
+    new_ax.set_xticks([0] + x, [''] + labels) # the [0] and [''] stuff is to add an empty lable in the first position
 
     return new_ax
 
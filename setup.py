@@ -1,4 +1,4 @@
-from distutils.core import setup
+from setuptools import setup
 
 setup(
     name='MagikEDA',
@@ -11,10 +11,11 @@ setup(
     license='LICENSE',
     description='Scripts to help Exploratory Data Analysis',
     long_description=open('README.md').read(),
+    python_requires=">=3.8",
     install_requires=[
-        "pandas >= 0.15.2",
-        "numpy >= 1.9.2",
-        "matplotlib >= 1.4.3",
+        "pandas >= 1.0",
+        "numpy >= 1.17",
+        "matplotlib >= 3.6",
 	"basemap >= 1.0.7"
     ],
 )
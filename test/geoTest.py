@@ -4,6 +4,7 @@ Test Case for module geo.py.
 
 import matplotlib.pyplot as plt
 import pandas as pd
+import numpy as np
 import unittest
 import gc
 from magikeda import geo
@@ -28,6 +29,60 @@ class GeoTestCase(unittest.TestCase):
         geo.plot_path_from_above(lon, lat, color=colors(color_idxs), show_map=True, padding=2, aspect_ratio= 2./4, ax=ax)
         plt.show()
 
+    def test_plot_path_from_above_missing_coordinates(self):
+
+        # Missing coordinates must be ignored when computing the box of the map
+        lat = pd.Series([41.2, np.nan, 41.1, 41.6])
+        lon = pd.Series([-2.2, -1.9, np.nan, -1.8])
+        fig, ax = plt.subplots()
+        geo.plot_path_from_above(lon, lat, show_map=True, padding=1, ax=ax)
+        plt.close(fig)
+
+    def test_compute_bbox(self):
+
+        # A ratio of 0.5 keeps half of the square box height, removing the same amount from the top and the bottom
+        self.assertEqual(geo._compute_bbox(40., 41., -4., 0., 0.5, 0.), (40.75, 42.25, -4., 0.))
+
+        # Named and explicit boxes, with padding
+        self.assertEqual(geo._compute_bbox(40., 41., -4., 0., 'square', 4.), (37., 46., -8., 4.))
+        self.assertEqual(geo._compute_bbox(40., 41., -4., 0., 'fit_extremities', 0.), (40., 41., -4., 0.))
+        self.assertEqual(geo._compute_bbox(40., 41., -4., 0., (1., 2., 3., 4.), 0.), (1., 2., 3., 4.))
+        self.assertRaises(Exception, geo._compute_bbox, 40., 41., -4., 0., 'round', 0.)
+
+    def test_haversine(self):
+
+        # Distance between Madrid and Barcelona (approximately 505 km)
+        d = geo.haversine(-3.70, 40.42, 2.17, 41.39)
+        self.assertIsInstance(d, float)
+        self.assertAlmostEqual(d, 505., delta=5.)
+
+        # Element-wise distances between series of coordinates must match the scalar version
+        lon1 = pd.Series([-2.2, -1.9, -1.4])
+        lat1 = pd.Series([41.2, 41.5, 41.1])
+        lon2 = pd.Series([-1.8, -0.5, -3.1])
+        lat2 = pd.Series([41.6, 42.2, 43.3])
+        distances = geo.haversine(lon1, lat1, lon2, lat2)
+        for i in range(len(lon1)):
+            self.assertAlmostEqual(distances[i], geo.haversine(lon1[i], lat1[i], lon2[i], lat2[i]))
+
+    def test_distances_points_to_segments(self):
+
+        # Points before, over, after and apart from a segment, plus a degenerated segment
+        px = [-1., 0.5, 3., 1., 0.]
+        py = [0., 0., 0., 1., 0.]
+        x1 = [0., 0., 0., 0., 1.]
+        y1 = [0., 0., 0., 0., 1.]
+        x2 = [2., 2., 2., 2., 1.]
+        y2 = [0., 0., 0., 0., 1.]
+
+        # The batched version must agree with the scalar one
+        distances = geo.distances_points_to_segments(px, py, x1, y1, x2, y2)
+        for i, args in enumerate(zip(px, py, x1, y1, x2, y2)):
+            self.assertAlmostEqual(distances[i], geo.distance_from_point_to_segment(*args))
+
+        # Broadcasting many points against a single segment
+        np.testing.assert_allclose(geo.distances_points_to_segments(px[:4], py[:4], 0., 0., 2., 0.), [1., 0., 1., 1.])
+
     def tearDown(self):
         gc.collect()
 
@@ -4,8 +4,10 @@ Test Case for module mouseoverscatter.py.
 
 import matplotlib.pyplot as plt
 import pandas as pd
+import time
 import unittest
 
+from matplotlib.backend_bases import MouseEvent
 from magikeda import bivar
 
 class MouseoverscatterTestCase(unittest.TestCase):
@@ -15,5 +17,31 @@ class MouseoverscatterTestCase(unittest.TestCase):
         # Plota the mouse over scatter with some points
         bivar.plot_mouse_over_scatter([0, 1.5, 2, 2.5], [0, 1.5, 2, 3], ['Message %s'%i for i in [1,2,3, 4]], c=['r','r','b','g'])
 
+    def test_hover(self):
+
+        # Plot the points with tips given by a series with a non default index, and draw the figure
+        fig, ax = plt.subplots()
+        tips = pd.Series(['Message %s'%i for i in [1, 2, 3, 4]], index=[10, 11, 12, 13])
+        bivar.plot_mouse_over_scatter([0, 1.5, 2, 2.5], [0, 1.5, 2, 3], tips, ax=ax)
+        fig.canvas.draw()
+        annotation = ax.texts[0]
+
+        # Function to move the mouse to a point in data coordinates (waiting enough for the move not to be skipped)
+        def move_to(x, y):
+            time.sleep(bivar._MIN_MOVE_INTERVAL * 2)
+            x, y = ax.transData.transform((x, y))
+            fig.canvas.callbacks.process('motion_notify_event', MouseEvent('motion_notify_event', fig.canvas, x, y))
+
+        # The tip of the hovered point is shown
+        move_to(1.5, 1.5)
+        self.assertTrue(annotation.get_visible())
+        self.assertEqual(annotation.get_text(), 'Message 2')
+
+        # And hidden when the mouse leaves it
+        move_to(0.75, 2.5)
+        self.assertFalse(annotation.get_visible())
+
+        plt.close(fig)
+
 if __name__ == '__main__':
     unittest.main()
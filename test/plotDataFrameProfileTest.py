@@ -0,0 +1,54 @@
+"""
+Test Case for script bin/plot_data_frame_profile.py
+"""
+
+import importlib.util
+import os
+import tempfile
+import unittest
+import pandas as pd
+
+# Load the script as a module (the bin directory is not a package)
+_spec = importlib.util.spec_from_file_location('plot_data_frame_profile', os.path.join(os.path.dirname(__file__), '..', 'bin', 'plot_data_frame_profile.py'))
+plot_data_frame_profile = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(plot_data_frame_profile)
+
+
+class PlotDataFrameProfileTestCase(unittest.TestCase):
+
+    def read(self, text, **kwargs):
+        """ Write the text to a temporary CSV file and load it with read_csv_in_chunks """
+        with open(self.file_name, 'w') as f:
+            f.write(text)
+        return plot_data_frame_profile.read_csv_in_chunks(self.file_name, sep=',', encoding='latin1', **kwargs)
+
+    def test_read_csv_in_chunks(self):
+
+        # Text columns are loaded as categoricals, whose categories are joined across chunks (and sorted)
+        data = self.read('name,value\ny,1\nz,2\na,3\nb,4\ny,5\n', chunksize=2)
+        self.assertIsInstance(data['name'].dtype, pd.CategoricalDtype)
+        self.assertEqual(list(data['name'].cat.categories), ['a', 'b', 'y', 'z'])
+        self.assertEqual(list(data['name']), ['y', 'z', 'a', 'b', 'y'])
+        self.assertEqual(list(data['value']), [1, 2, 3, 4, 5])
+
+        # The dtypes given override the inferred ones
+        data = self.read('name,value\ny,1\nz,2\n', chunksize=1, dtypes={'value': 'float64'})
+        self.assertEqual(data['value'].dtype, 'float64')
+
+    def test_read_csv_in_chunks_empty(self):
+
+        # A file with just the header gives an empty data frame with its columns
+        data = self.read('name,value\n', chunksize=2)
+        self.assertEqual(list(data.columns), ['name', 'value'])
+        self.assertEqual(len(data), 0)
+
+    def setUp(self):
+        fd, self.file_name = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,6 +25,53 @@ class UnivarTestCase(unittest.TestCase):
         # Test both series at the same time
         univar.plot_bar_chart([d1, d2])
 
+        # Test a series without categories along with another one (its bars are empty)
+        ax = univar.plot_bar_chart([d1, pd.Series([np.nan] * 3, dtype='category')])
+        self.assertEqual([p.get_height() for p in ax.patches[3:]], [0., 0., 0.])
+
+        # Test a series with categories but only missing values
+        ax = univar.plot_bar_chart(pd.Series([np.nan] * 3, dtype=pd.CategoricalDtype(['a', 'b'])))
+        self.assertEqual(len(ax.patches), 0)
+
+        # Test an empty series
+        ax = univar.plot_bar_chart(pd.Series([], dtype='category'), title='Empty')
+        self.assertEqual(len(ax.patches), 0)
+
+    def test_percentage_of_categorical(self):
+
+        # Series with categories in another order than the plotted ones, with missing values and with strings
+        d1 = pd.Series(pd.Categorical(['c', 'a', None, 'a', 'c', 'b'], ['c', 'b', 'a']))
+        d2 = pd.Series(['b', 'b', None, 'a', 'b', 'd'])
+        d3 = pd.Series(pd.Categorical(['d', 'a', 'a'], ['d', 'a']))
+        categorias = pd.Index(['a', 'b', 'c', 'd'])
+
+        # The percentages must match the ones computed by pandas (missing values are not counted)
+        porcentagens = univar._get_percentage_of_categorical([d1, d2, d3], categorias)
+        for idx, series in enumerate([d1, d2, d3]):
+            esperado = series.value_counts(normalize=True).reindex(categorias, fill_value=0) * 100
+            np.testing.assert_allclose(porcentagens[idx], esperado.to_numpy())
+
+        # Values not in the plotted categories still count in the total of their series
+        d4 = pd.Series(['a', 'b', 'z', 'z'])
+        d5 = pd.Series(pd.Categorical(['a', 'z', 'z', 'b'], ['a', 'b', 'z']))
+        porcentagens = univar._get_percentage_of_categorical([d4, d5], pd.Index(['a', 'b']))
+        np.testing.assert_allclose(porcentagens, [[25., 25.], [25., 25.]])
+
+    def test_counts_for_frame(self):
+
+        # Two columns sharing the same categories (counted together) and another one with its own categories
+        tipo = pd.CategoricalDtype(['z', 'y', 'x'])
+        data_frame = pd.DataFrame({
+            'Var 1': pd.Series(['x', 'y', None, 'x'], dtype=tipo),
+            'Var 2': pd.Series(['z', 'z', 'y', None], dtype=tipo),
+            'Var 3': pd.Series(pd.Categorical(['q', 'p', 'q', 'q'])),
+        })
+
+        # The counts must match the ones computed by pandas (in the order of the categories of each column)
+        contagens = univar._counts_for_frame(data_frame, ['Var 1', 'Var 2', 'Var 3'])
+        for column_name in data_frame.columns:
+            np.testing.assert_array_equal(contagens[column_name], data_frame[column_name].value_counts(sort=False).to_numpy())
+
     def test_dataframe_profile(self):
 
         # Plot a simple data frame with two categorical variables and one numerical
@@ -39,6 +86,12 @@ class UnivarTestCase(unittest.TestCase):
             xlabels={'Var 2': 'X lable of Var 2'}
         )
 
+    def test_dataframe_profile_empty_column(self):
+
+        # A numeric column with only missing values is shown as an empty subplot
+        univar.plot_dataframe_profile(pd.DataFrame({'Var 1': np.random.rand(6), 'Var 2': np.nan}))
+        self.assertEqual([t.get_text() for t in plt.gcf().axes[1].texts], ['no data'])
+
     def test_add_extra_xaxis(self):
 
         # Create a new figure